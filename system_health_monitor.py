@@ -7,11 +7,70 @@ A beginner DevOps project to monitor system health metrics
 import psutil
 import json
 import datetime
+import heapq
 import time
 import argparse
+import os
+import platform
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 
+try:
+    # Optional: much faster JSON encoding for --save
+    import orjson
+except ImportError:
+    orjson = None
+
+# Filesystems that don't represent real storage and aren't worth alerting on
+_PSEUDO_FILESYSTEMS = {'tmpfs', 'devtmpfs', 'squashfs', 'overlay', 'proc', 'sysfs', 'cgroup', 'cgroup2'}
+
+# How long (seconds) to reuse the partition list before re-reading the mount table
+_PARTITIONS_TTL = 60.0
+
+_BYTES_PER_GB = 1024 ** 3
+
+# Sections collected at each --detail level. check_alerts needs CPU, memory and disk,
+# print_summary adds system info, and only the saved JSON uses network and process data.
+_DETAIL_SECTIONS = {
+    'alerts': ('cpu_info', 'memory_info', 'disk_info'),
+    'summary': ('system_info', 'cpu_info', 'memory_info', 'disk_info'),
+    'full': ('system_info', 'cpu_info', 'memory_info', 'disk_info', 'network_info', 'process_info')
+}
+
+def _cpu_busy_and_total(times) -> tuple:
+    """Split a psutil.cpu_times() sample into (busy, total) seconds, like psutil.cpu_percent()"""
+    total = sum(times)
+    # On Linux guest time is already included in user/nice, so don't count it twice
+    total -= getattr(times, 'guest', 0) + getattr(times, 'guest_nice', 0)
+    busy = total - times.idle - getattr(times, 'iowait', 0)
+    return busy, total
+
+def _to_gb(num_bytes: int) -> float:
+    """Convert a byte count to gigabytes, rounded to 2 decimals"""
+    return round(num_bytes / _BYTES_PER_GB, 2)
+
+class _MissingAsNA(dict):
+    """Dict that fills in 'N/A' for missing keys when formatting summary templates"""
+    def __missing__(self, key):
+        return 'N/A'
+
+_SEP = "=" * 50
+
+# Summary sections, filled in with str.format_map() from the matching health_data section
+_SUMMARY_HEADER_TMPL = f"\n{_SEP}\nSYSTEM HEALTH SUMMARY\n{_SEP}\nTimestamp: {{timestamp}}\n"
+_SYSTEM_TMPL = "\nSystem: {hostname} ({platform})\nUptime: {uptime_hours} hours\n"
+_CPU_TMPL = "\nCPU Usage: {cpu_percent}%\nCPU Cores: {cpu_count_logical} logical, {cpu_count_physical} physical\n"
+_MEMORY_TMPL = "\nMemory Usage: {memory_percent}%\nMemory: {memory_used_gb} GB / {memory_total_gb} GB\n"
+_DISK_TMPL = "  {mount}: {percent}% ({used_gb} GB / {total_gb} GB)\n"
+_SUMMARY_FOOTER = _SEP + "\n"
+
+def _encode_json(data: Dict[str, Any]) -> bytes:
+    """Encode data as indented JSON, using orjson when it's installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode('utf-8')
+
 class SystemHealthMonitor:
     def __init__(self, alert_thresholds: Dict[str, float] = None):
         """
@@ -19,38 +78,77 @@ class SystemHealthMonitor:
         
         Args:
             alert_thresholds: Dictionary with threshold values for alerts
+        
+        CPU usage is measured from one collection to the next, starting with a
+        snapshot taken here. Calling collect_all_metrics() right after creating
+        the monitor gives a very short sample window, so wait a moment first
+        (the CLI sleeps 0.5s) if the first CPU reading matters.
         """
         self.alert_thresholds = alert_thresholds or {
             'cpu_percent': 80.0,
             'memory_percent': 85.0,
             'disk_percent': 90.0
         }
+        
+        # Host identity, boot time and core counts don't change while we run, so look them up once
+        self._uname = platform.uname()
+        self._boot_time_ts = psutil.boot_time()
+        self._boot_time_str = datetime.datetime.fromtimestamp(self._boot_time_ts).strftime('%Y-%m-%d %H:%M:%S')
+        self._cpu_count_logical = psutil.cpu_count()
+        self._cpu_count_physical = psutil.cpu_count(logical=False)
+        
+        # CPU time snapshot that the next get_cpu_info() call measures against
+        self._prev_cpu_times = psutil.cpu_times()
+        
+        # Mounted partitions rarely change, so they're cached and refreshed every _PARTITIONS_TTL seconds
+        self._parts_cache = None
+        self._parts_cache_ts = 0.0
+        
+        # Previous network counters, used to turn running totals into rates
+        self._prev_net = psutil.net_io_counters(pernic=True)
+        self._prev_net_ts = time.monotonic()
+        
+        # Background writer for save_to_file, created on first use
+        self._writer = None
     
     def get_system_info(self) -> Dict[str, Any]:
         """Get basic system information"""
         try:
-            boot_time = datetime.datetime.fromtimestamp(psutil.boot_time())
             return {
-                'hostname': psutil.os.uname().nodename,
-                'platform': psutil.os.uname().system,
-                'architecture': psutil.os.uname().machine,
-                'boot_time': boot_time.strftime('%Y-%m-%d %H:%M:%S'),
-                'uptime_hours': round((time.time() - psutil.boot_time()) / 3600, 2)
+                'hostname': self._uname.node,
+                'platform': self._uname.system,
+                'architecture': self._uname.machine,
+                'boot_time': self._boot_time_str,
+                'uptime_hours': round((time.time() - self._boot_time_ts) / 3600, 2)
             }
         except Exception as e:
             return {'error': f'Failed to get system info: {str(e)}'}
     
     def get_cpu_info(self) -> Dict[str, Any]:
-        """Get CPU usage information"""
+        """Get CPU usage information
+        
+        cpu_percent covers the time since the previous call (or since the monitor
+        was created). The monitor keeps its own cpu_times() snapshot rather than
+        relying on psutil.cpu_percent(interval=None), whose baseline is per thread
+        and so doesn't survive the collectors running on worker threads.
+        """
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
-            cpu_count = psutil.cpu_count()
+            cpu_times = psutil.cpu_times()
+            prev_busy, prev_total = _cpu_busy_and_total(self._prev_cpu_times)
+            busy, total = _cpu_busy_and_total(cpu_times)
+            self._prev_cpu_times = cpu_times
+            
+            elapsed = total - prev_total
+            if elapsed > 0:
+                cpu_percent = round(min(max((busy - prev_busy) / elapsed * 100, 0.0), 100.0), 1)
+            else:
+                cpu_percent = 0.0
             cpu_freq = psutil.cpu_freq()
             
             return {
                 'cpu_percent': cpu_percent,
-                'cpu_count_logical': cpu_count,
-                'cpu_count_physical': psutil.cpu_count(logical=False),
+                'cpu_count_logical': self._cpu_count_logical,
+                'cpu_count_physical': self._cpu_count_physical,
                 'cpu_frequency_mhz': round(cpu_freq.current, 2) if cpu_freq else 'N/A',
                 'load_average': psutil.getloadavg() if hasattr(psutil, 'getloadavg') else 'N/A'
             }
@@ -64,58 +162,100 @@ class SystemHealthMonitor:
             swap = psutil.swap_memory()
             
             return {
-                'memory_total_gb': round(memory.total / (1024**3), 2),
-                'memory_available_gb': round(memory.available / (1024**3), 2),
-                'memory_used_gb': round(memory.used / (1024**3), 2),
+                'memory_total_gb': _to_gb(memory.total),
+                'memory_available_gb': _to_gb(memory.available),
+                'memory_used_gb': _to_gb(memory.used),
                 'memory_percent': memory.percent,
-                'swap_total_gb': round(swap.total / (1024**3), 2),
-                'swap_used_gb': round(swap.used / (1024**3), 2),
+                'swap_total_gb': _to_gb(swap.total),
+                'swap_used_gb': _to_gb(swap.used),
                 'swap_percent': swap.percent
             }
         except Exception as e:
             return {'error': f'Failed to get memory info: {str(e)}'}
     
+    @staticmethod
+    def _safe_disk_usage(mountpoint: str):
+        """Return disk usage for a mountpoint, or None if we can't access it"""
+        try:
+            return psutil.disk_usage(mountpoint)
+        except PermissionError:
+            return None
+    
+    def _get_partitions(self) -> list:
+        """Get real (non-pseudo) disk partitions, cached for _PARTITIONS_TTL seconds"""
+        now = time.monotonic()
+        if self._parts_cache is None or now - self._parts_cache_ts > _PARTITIONS_TTL:
+            self._parts_cache = [
+                p for p in psutil.disk_partitions(all=False)
+                if p.fstype not in _PSEUDO_FILESYSTEMS
+            ]
+            self._parts_cache_ts = now
+        return self._parts_cache
+    
     def get_disk_info(self) -> Dict[str, Any]:
         """Get disk usage information"""
         try:
-            disk_partitions = psutil.disk_partitions()
+            disk_partitions = self._get_partitions()
             disk_info = {}
             
-            for partition in disk_partitions:
-                try:
-                    usage = psutil.disk_usage(partition.mountpoint)
-                    disk_info[partition.mountpoint] = {
-                        'device': partition.device,
-                        'filesystem': partition.fstype,
-                        'total_gb': round(usage.total / (1024**3), 2),
-                        'used_gb': round(usage.used / (1024**3), 2),
-                        'free_gb': round(usage.free / (1024**3), 2),
-                        'percent': round((usage.used / usage.total) * 100, 2)
-                    }
-                except PermissionError:
+            if not disk_partitions:
+                return disk_info
+            
+            # statvfs releases the GIL, so a slow mount (NFS, USB) doesn't hold up the rest
+            with ThreadPoolExecutor(max_workers=min(len(disk_partitions), 8)) as executor:
+                usages = list(executor.map(lambda p: self._safe_disk_usage(p.mountpoint), disk_partitions))
+            
+            for partition, usage in zip(disk_partitions, usages):
+                if usage is None:
                     # Skip partitions we can't access
                     continue
+                disk_info[partition.mountpoint] = {
+                    'device': partition.device,
+                    'filesystem': partition.fstype,
+                    'total_gb': _to_gb(usage.total),
+                    'used_gb': _to_gb(usage.used),
+                    'free_gb': _to_gb(usage.free),
+                    'percent': round((usage.used / usage.total) * 100, 2)
+                }
             
             return disk_info
         except Exception as e:
             return {'error': f'Failed to get disk info: {str(e)}'}
     
     def get_network_info(self) -> Dict[str, Any]:
-        """Get network interface information"""
+        """Get network interface information
+        
+        Along with the running totals, reports send/receive rates since the previous call
+        """
         try:
             network_stats = psutil.net_io_counters(pernic=True)
+            now = time.monotonic()
+            elapsed = now - self._prev_net_ts
             network_info = {}
             
             for interface, stats in network_stats.items():
+                prev = self._prev_net.get(interface)
+                if prev is not None and elapsed > 0:
+                    # Clamp at 0 in case the counters were reset (e.g. interface re-created)
+                    sent_per_sec = round(max(stats.bytes_sent - prev.bytes_sent, 0) / elapsed, 2)
+                    recv_per_sec = round(max(stats.bytes_recv - prev.bytes_recv, 0) / elapsed, 2)
+                else:
+                    sent_per_sec = recv_per_sec = 0.0
+                
                 network_info[interface] = {
                     'bytes_sent': stats.bytes_sent,
                     'bytes_recv': stats.bytes_recv,
                     'packets_sent': stats.packets_sent,
                     'packets_recv': stats.packets_recv,
                     'errors_in': stats.errin,
-                    'errors_out': stats.errout
+                    'errors_out': stats.errout,
+                    'bytes_sent_per_sec': sent_per_sec,
+                    'bytes_recv_per_sec': recv_per_sec
                 }
             
+            self._prev_net = network_stats
+            self._prev_net_ts = now
+            
             return network_info
         except Exception as e:
             return {'error': f'Failed to get network info: {str(e)}'}
@@ -130,11 +270,11 @@ class SystemHealthMonitor:
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     continue
             
-            # Sort by CPU usage
-            top_cpu = sorted(processes, key=lambda x: x['cpu_percent'] or 0, reverse=True)[:top_n]
+            # Top N by CPU usage (partial selection, no need to sort every process)
+            top_cpu = heapq.nlargest(top_n, processes, key=lambda x: x['cpu_percent'] or 0)
             
-            # Sort by memory usage
-            top_memory = sorted(processes, key=lambda x: x['memory_percent'] or 0, reverse=True)[:top_n]
+            # Top N by memory usage
+            top_memory = heapq.nlargest(top_n, processes, key=lambda x: x['memory_percent'] or 0)
             
             return {
                 'total_processes': len(processes),
@@ -147,104 +287,143 @@ class SystemHealthMonitor:
     def check_alerts(self, health_data: Dict[str, Any]) -> list:
         """Check if any metrics exceed alert thresholds"""
         alerts = []
+        cpu_threshold = self.alert_thresholds['cpu_percent']
+        memory_threshold = self.alert_thresholds['memory_percent']
+        disk_threshold = self.alert_thresholds['disk_percent']
         
         # Check CPU
-        if 'cpu_info' in health_data and 'cpu_percent' in health_data['cpu_info']:
-            cpu_percent = health_data['cpu_info']['cpu_percent']
-            if cpu_percent > self.alert_thresholds['cpu_percent']:
-                alerts.append(f"HIGH CPU USAGE: {cpu_percent}% (threshold: {self.alert_thresholds['cpu_percent']}%)")
+        cpu_percent = health_data.get('cpu_info', {}).get('cpu_percent')
+        if cpu_percent is not None and cpu_percent > cpu_threshold:
+            alerts.append(f"HIGH CPU USAGE: {cpu_percent}% (threshold: {cpu_threshold}%)")
         
         # Check Memory
-        if 'memory_info' in health_data and 'memory_percent' in health_data['memory_info']:
-            memory_percent = health_data['memory_info']['memory_percent']
-            if memory_percent > self.alert_thresholds['memory_percent']:
-                alerts.append(f"HIGH MEMORY USAGE: {memory_percent}% (threshold: {self.alert_thresholds['memory_percent']}%)")
+        memory_percent = health_data.get('memory_info', {}).get('memory_percent')
+        if memory_percent is not None and memory_percent > memory_threshold:
+            alerts.append(f"HIGH MEMORY USAGE: {memory_percent}% (threshold: {memory_threshold}%)")
         
         # Check Disk
-        if 'disk_info' in health_data:
-            disk_info = health_data['disk_info']
-            if isinstance(disk_info, dict):
-                for mount_point, disk_data in disk_info.items():
-                    if isinstance(disk_data, dict) and 'percent' in disk_data:
-                        disk_percent = disk_data['percent']
-                        if disk_percent > self.alert_thresholds['disk_percent']:
-                            alerts.append(f"HIGH DISK USAGE: {mount_point} at {disk_percent}% (threshold: {self.alert_thresholds['disk_percent']}%)")
+        disk_info = health_data.get('disk_info')
+        if isinstance(disk_info, dict):
+            for mount_point, disk_data in disk_info.items():
+                if isinstance(disk_data, dict):
+                    disk_percent = disk_data.get('percent')
+                    if disk_percent is not None and disk_percent > disk_threshold:
+                        alerts.append(f"HIGH DISK USAGE: {mount_point} at {disk_percent}% (threshold: {disk_threshold}%)")
         
         return alerts
     
-    def collect_all_metrics(self) -> Dict[str, Any]:
-        """Collect all system health metrics"""
+    def collect_all_metrics(self, detail: str = 'full') -> Dict[str, Any]:
+        """
+        Collect system health metrics
+        
+        Args:
+            detail: How much to collect - 'alerts', 'summary' or 'full' (see _DETAIL_SECTIONS)
+        """
         timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        health_data = {
-            'timestamp': timestamp,
-            'system_info': self.get_system_info(),
-            'cpu_info': self.get_cpu_info(),
-            'memory_info': self.get_memory_info(),
-            'disk_info': self.get_disk_info(),
-            'network_info': self.get_network_info(),
-            'process_info': self.get_process_info()
+        collectors = {
+            'system_info': self.get_system_info,
+            'cpu_info': self.get_cpu_info,
+            'memory_info': self.get_memory_info,
+            'disk_info': self.get_disk_info,
+            'network_info': self.get_network_info,
+            'process_info': self.get_process_info
         }
+        sections = _DETAIL_SECTIONS[detail]
+        collectors = {key: collector for key, collector in collectors.items() if key in sections}
+        
+        # Collectors are independent and mostly wait on syscalls, so run them side by side.
+        # Each one catches its own exceptions and returns an 'error' entry instead.
+        with ThreadPoolExecutor(max_workers=len(collectors)) as executor:
+            futures = {key: executor.submit(collector) for key, collector in collectors.items()}
+            health_data = {'timestamp': timestamp}
+            health_data.update((key, future.result()) for key, future in futures.items())
         
         # Add alerts
         health_data['alerts'] = self.check_alerts(health_data)
         
         return health_data
     
+    @staticmethod
+    def _write_file(filename: str, payload: bytes):
+        """Write an encoded payload to filename (runs on the writer thread)"""
+        try:
+            view = memoryview(payload)
+            flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+            fd = os.open(filename, flags, 0o644)
+            try:
+                while view:
+                    written = os.write(fd, view)
+                    view = view[written:]
+            finally:
+                os.close(fd)
+            print(f"Health data saved to: {filename}")
+        except Exception as e:
+            print(f"Error saving to file: {str(e)}")
+    
     def save_to_file(self, data: Dict[str, Any], filename: str = None):
-        """Save health data to JSON file"""
+        """Save health data to JSON file
+        
+        The data is encoded right away, but the file is written on a background
+        thread so the caller doesn't wait on disk I/O. Call cleanup() before
+        exiting to make sure all writes have finished.
+        """
         if filename is None:
             timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f'system_health_{timestamp}.json'
         
         try:
-            with open(filename, 'w') as f:
-                json.dump(data, f, indent=2)
-            print(f"Health data saved to: {filename}")
+            payload = _encode_json(data)
         except Exception as e:
             print(f"Error saving to file: {str(e)}")
+            return
+        
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1)
+        self._writer.submit(self._write_file, filename, payload)
+    
+    def cleanup(self):
+        """Wait for pending file writes and release background resources"""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
     
     def print_summary(self, data: Dict[str, Any]):
         """Print a summary of system health"""
-        print("\n" + "="*50)
-        print("SYSTEM HEALTH SUMMARY")
-        print("="*50)
-        print(f"Timestamp: {data['timestamp']}")
+        parts = [_SUMMARY_HEADER_TMPL.format_map(_MissingAsNA(data))]
         
         # System Info
         if 'system_info' in data:
-            sys_info = data['system_info']
-            print(f"\nSystem: {sys_info.get('hostname', 'N/A')} ({sys_info.get('platform', 'N/A')})")
-            print(f"Uptime: {sys_info.get('uptime_hours', 'N/A')} hours")
+            parts.append(_SYSTEM_TMPL.format_map(_MissingAsNA(data['system_info'])))
         
         # CPU Info
         if 'cpu_info' in data:
-            cpu_info = data['cpu_info']
-            print(f"\nCPU Usage: {cpu_info.get('cpu_percent', 'N/A')}%")
-            print(f"CPU Cores: {cpu_info.get('cpu_count_logical', 'N/A')} logical, {cpu_info.get('cpu_count_physical', 'N/A')} physical")
+            parts.append(_CPU_TMPL.format_map(_MissingAsNA(data['cpu_info'])))
         
         # Memory Info
         if 'memory_info' in data:
-            mem_info = data['memory_info']
-            print(f"\nMemory Usage: {mem_info.get('memory_percent', 'N/A')}%")
-            print(f"Memory: {mem_info.get('memory_used_gb', 'N/A')} GB / {mem_info.get('memory_total_gb', 'N/A')} GB")
+            parts.append(_MEMORY_TMPL.format_map(_MissingAsNA(data['memory_info'])))
         
         # Disk Info Summary
         if 'disk_info' in data and isinstance(data['disk_info'], dict):
-            print("\nDisk Usage:")
+            parts.append("\nDisk Usage:\n")
             for mount, disk_data in data['disk_info'].items():
                 if isinstance(disk_data, dict):
-                    print(f"  {mount}: {disk_data.get('percent', 'N/A')}% ({disk_data.get('used_gb', 'N/A')} GB / {disk_data.get('total_gb', 'N/A')} GB)")
+                    parts.append(_DISK_TMPL.format_map(_MissingAsNA(disk_data, mount=mount)))
         
         # Alerts
         if data.get('alerts'):
-            print("\n⚠️  ALERTS:")
-            for alert in data['alerts']:
-                print(f"  • {alert}")
+            parts.append("\n⚠️  ALERTS:\n")
+            parts.extend(f"  • {alert}\n" for alert in data['alerts'])
         else:
-            print("\n✅ No alerts - system is healthy!")
+            parts.append("\n✅ No alerts - system is healthy!\n")
         
-        print("="*50)
+        parts.append(_SUMMARY_FOOTER)
+        
+        # One write for the whole block instead of one print() per line, flushed so
+        # it goes out as a single syscall even when stdout is a pipe
+        sys.stdout.write(''.join(parts))
+        sys.stdout.flush()
 
 def main():
     parser = argparse.ArgumentParser(description='System Health Monitor')
@@ -255,9 +434,14 @@ def main():
     parser.add_argument('--disk-threshold', type=float, default=90.0, help='Disk alert threshold (default: 90%%)')
     parser.add_argument('--continuous', action='store_true', help='Run continuously (Ctrl+C to stop)')
     parser.add_argument('--interval', type=int, default=30, help='Interval in seconds for continuous monitoring (default: 30)')
+    parser.add_argument('--detail', choices=list(_DETAIL_SECTIONS),
+                        help='Metrics to collect: alerts, summary or full (default: full with --save, otherwise summary)')
     
     args = parser.parse_args()
     
+    # Network and process data only show up in the saved JSON
+    detail = args.detail or ('full' if args.save else 'summary')
+    
     # Set up thresholds
     thresholds = {
         'cpu_percent': args.cpu_threshold,
@@ -268,21 +452,32 @@ def main():
     monitor = SystemHealthMonitor(thresholds)
     
     try:
+        # Give the CPU snapshot taken in __init__ a short window so the first reading means something
+        time.sleep(0.5)
+        
         if args.continuous:
             print(f"Starting continuous monitoring (interval: {args.interval} seconds)")
             print("Press Ctrl+C to stop")
             
+            # Schedule cycles on a fixed monotonic grid so collection time doesn't add drift
+            next_deadline = time.monotonic()
             while True:
-                health_data = monitor.collect_all_metrics()
+                health_data = monitor.collect_all_metrics(detail)
                 monitor.print_summary(health_data)
                 
                 if args.save:
                     monitor.save_to_file(health_data, args.output)
                 
-                time.sleep(args.interval)
+                next_deadline += args.interval
+                sleep_for = next_deadline - time.monotonic()
+                if sleep_for > 0:
+                    time.sleep(sleep_for)
+                else:
+                    # We overran the interval; start a fresh schedule instead of bursting to catch up
+                    next_deadline = time.monotonic()
         else:
             # Single run
-            health_data = monitor.collect_all_metrics()
+            health_data = monitor.collect_all_metrics(detail)
             monitor.print_summary(health_data)
             
             if args.save:
@@ -294,6 +489,8 @@ def main():
     except Exception as e:
         print(f"Error: {str(e)}")
         sys.exit(1)
+    finally:
+        monitor.cleanup()
 
 if __name__ == "__main__":
     main()